@@ -74,6 +74,11 @@ ENABLE_TAKE_PROFIT = False  # Take profit at 0.99 (False = hold until market res
 # ============================================
 DATA_COLLECTOR_API_URL = os.getenv("DATA_COLLECTOR_API_URL", "http://localhost:8000")
 
+# ============================================
+# POSITION RECOVERY
+# ============================================
+POSITION_LOG_FILE = "logs/positions.bin"  # Append-only fill/close event log
+
 # ============================================
 # LOGGING
 # ============================================
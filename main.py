@@ -175,21 +175,27 @@ class FastTradingBot:
     
     async def _refresh_market(self):
         """SLOW PATH: Find new market and set up (runs every ~15 min)"""
-        # Save previous market data if it expired
-        if getattr(self, '_market_expired', False) and self.data_collector.has_active_market():
-            # Determine winner based on last known prices
-            winner = None
-            if self.locked_up_token and self.locked_down_token:
-                prices = self.ws_monitor.get_prices()
-                if prices:
-                    up_price = prices.get(self.locked_up_token, 0)
-                    down_price = prices.get(self.locked_down_token, 0)
-                    if up_price > 0.5:
-                        winner = 'UP'
-                    elif down_price > 0.5:
-                        winner = 'DOWN'
+        if getattr(self, '_market_expired', False):
+            # Save previous market data
+            if self.data_collector.has_active_market():
+                # Determine winner based on last known prices
+                winner = None
+                if self.locked_up_token and self.locked_down_token:
+                    prices = self.ws_monitor.get_prices()
+                    if prices:
+                        up_price = prices.get(self.locked_up_token, 0)
+                        down_price = prices.get(self.locked_down_token, 0)
+                        if up_price > 0.5:
+                            winner = 'UP'
+                        elif down_price > 0.5:
+                            winner = 'DOWN'
+                
+                await self.data_collector.save_market(winner=winner)
             
-            await self.data_collector.save_market(winner=winner)
+            # Market resolved - stop tracking its positions (payout comes via redeem)
+            for token_id in (self.locked_up_token, self.locked_down_token):
+                if token_id:
+                    self.trader.remove_position(token_id)
             self._market_expired = False
         
         # Clear locked state
@@ -269,23 +275,25 @@ class FastTradingBot:
         t0 = time.perf_counter()
 
         # Get prices - WebSocket (instant) or HTTP (fallback)
-        if self.use_websocket:
-            # INSTANT: Read from memory (no network call!)
-            prices = self.ws_monitor.get_prices()
-            if not prices:
-                prices = await self.ws_monitor.get_prices_with_fallback()
+        ws_prices = self.ws_monitor.get_prices_tuple() if self.use_websocket else None
+        if ws_prices:
+            # INSTANT: Read from memory (no network call, no dict allocation)
+            up_price, down_price = ws_prices
         else:
-            # HTTP polling fallback
-            prices = await self.monitor.get_prices_batch([
-                self.locked_up_token,
-                self.locked_down_token
-            ])
+            if self.use_websocket:
+                prices = await self.ws_monitor.get_prices_with_fallback()
+            else:
+                # HTTP polling fallback
+                prices = await self.monitor.get_prices_batch([
+                    self.locked_up_token,
+                    self.locked_down_token
+                ])
 
-        if not prices:
-            return
+            if not prices:
+                return
 
-        up_price = prices.get(self.locked_up_token)
-        down_price = prices.get(self.locked_down_token)
+            up_price = prices.get(self.locked_up_token)
+            down_price = prices.get(self.locked_down_token)
 
         # Skip if no valid prices
         if up_price is None or down_price is None:
@@ -363,7 +371,7 @@ class FastTradingBot:
 
             # Execute trade using PRE-SIGNED order (FAST PATH)
             # GTC = Good Till Cancelled - limit order waits in orderbook
-            order = self.trader.execute_presigned_buy(
+            order = await self.trader.execute_presigned_buy_async(
                 token_id=token_id,
                 side=trade_side,
                 price=ENTRY_PRICE,
@@ -407,6 +415,9 @@ class FastTradingBot:
         
         await self.monitor.close()
         
+        # Stop the trader's background connection warmup
+        self.trader.close()
+        
         positions = self.trader.get_all_positions()
         if positions:
             logger.warning(f"{len(positions)} open positions - close manually on Polymarket")
@@ -433,6 +444,14 @@ async def main():
 
 
 if __name__ == "__main__":
+    # Optional: libuv-based event loop cuts per-await overhead on the
+    # WebSocket receive path (ws.recv() and the keepalive pings)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -29,7 +29,7 @@ logger = logging.getLogger(__name__)
 POOL_LIMITS = httpx.Limits(
     max_keepalive_connections=20,
     max_connections=50,
-    keepalive_expiry=30.0
+    keepalive_expiry=60.0  # Outlive gaps between WS-fallback fetches
 )
 
 
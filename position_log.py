@@ -0,0 +1,180 @@
+"""
+Append-only position event log for crash recovery
+
+Every fill and close is written as a fixed-size binary record before the
+in-memory position map is updated. On startup the log is replayed to
+rebuild the open positions, so a crash or restart does not lose track of
+shares we are holding. Positions whose market has already ended are dropped
+during replay, and the log is compacted down to the surviving OPEN records.
+
+Record layout (little-endian, 120 bytes):
+    event_type  B      1 = OPEN, 2 = CLOSE
+    side        B      1 = up, 2 = down, 0 = n/a
+    token_id    78s    Full token ID (uint256 in decimal, null padded)
+    price       d      Entry price (0 for CLOSE)
+    shares      d      Shares filled (0 for CLOSE)
+    expires     d      Unix end time of the market (0 = unknown)
+    timestamp   d      Unix time of the event
+    nonce       Q      Monotonic sequence number
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Event types
+EVENT_OPEN = 1
+EVENT_CLOSE = 2
+
+_RECORD = struct.Struct("<BB78sddddQ")
+RECORD_SIZE = _RECORD.size
+
+_SIDE_TO_CODE = {'up': 1, 'down': 2}
+_CODE_TO_SIDE = {1: 'up', 2: 'down'}
+
+
+class PositionLog:
+    """
+    Append-only binary log of position events.
+
+    Writes are flushed immediately so the log survives a process crash.
+    Replay returns the positions that were still open when the log ended.
+    The file is only created on the first append.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._nonce = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._disabled = False
+
+    def _open(self) -> bool:
+        """Open the log for appending, creating its directory if needed"""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'ab', buffering=0)
+        except OSError as e:
+            logger.warning(f"Position log disabled ({self.path}): {e}")
+            self._disabled = True
+            return False
+        return True
+
+    def replay(self) -> Dict[str, Dict]:
+        """
+        Rebuild open positions from the log.
+
+        OPEN records for markets that have already ended are dropped. If
+        anything was dropped (closed, expired, or a torn trailing record),
+        the log is rewritten with only the surviving OPEN records so it
+        does not grow without bound across restarts.
+
+        Returns:
+            Dict of token_id -> position data (market info is not persisted)
+        """
+        positions: Dict[str, Dict] = {}
+        records: Dict[str, bytes] = {}
+
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return positions
+        except OSError as e:
+            logger.warning(f"Could not read position log: {e}")
+            return positions
+
+        # Ignore a trailing partial record (crash mid-write)
+        usable = len(data) - (len(data) % RECORD_SIZE)
+        now = time.time()
+
+        for offset in range(0, usable, RECORD_SIZE):
+            event_type, side, raw_token, price, shares, expires, ts, nonce = _RECORD.unpack_from(data, offset)
+            token_id = raw_token.rstrip(b'\x00').decode('ascii')
+            self._nonce = nonce
+
+            if event_type == EVENT_OPEN:
+                positions[token_id] = {
+                    'side': _CODE_TO_SIDE.get(side),
+                    'shares': shares,
+                    'entry_price': price,
+                    'entry_time': ts,
+                    'market': {}
+                }
+                records[token_id] = data[offset:offset + RECORD_SIZE]
+                if expires and expires <= now:
+                    # Market already resolved - nothing left to track
+                    del positions[token_id]
+                    del records[token_id]
+            elif event_type == EVENT_CLOSE:
+                positions.pop(token_id, None)
+                records.pop(token_id, None)
+
+        if len(records) * RECORD_SIZE != len(data):
+            self._compact(b''.join(records.values()))
+
+        if positions:
+            logger.info(f"Recovered {len(positions)} open position(s) from {self.path}")
+
+        return positions
+
+    def _compact(self, data: bytes):
+        """Atomically replace the log with the given records"""
+        tmp_path = self.path + '.tmp'
+        with self._lock:
+            if self._file:
+                # Reopened lazily against the new file on the next append
+                self._file.close()
+                self._file = None
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"Position log compaction failed: {e}")
+
+    def append(
+        self,
+        event_type: int,
+        token_id: str,
+        side: Optional[str] = None,
+        price: float = 0.0,
+        shares: float = 0.0,
+        expires: float = 0.0
+    ):
+        """Append a single event record"""
+        with self._lock:
+            if not self._file and (self._disabled or not self._open()):
+                return
+
+            self._nonce += 1
+            record = _RECORD.pack(
+                event_type,
+                _SIDE_TO_CODE.get(side, 0),
+                token_id.encode('ascii'),
+                price,
+                shares,
+                expires,
+                time.time(),
+                self._nonce
+            )
+            try:
+                self._file.write(record)
+            except OSError as e:
+                logger.error(f"Position log write failed: {e}")
+
+    def close(self):
+        """Close the underlying file"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
@@ -53,10 +53,8 @@ class FastRiskManager:
     
     def remove_stop_loss(self, token_id: str):
         """Remove a stop loss"""
-        if token_id in self.stop_losses:
-            del self.stop_losses[token_id]
-        if token_id in self.no_price_count:
-            del self.no_price_count[token_id]
+        self.stop_losses.pop(token_id, None)
+        self.no_price_count.pop(token_id, None)
     
     def check_stop_losses(self, current_prices: Dict[str, float]):
         """
@@ -0,0 +1,90 @@
+import os
+import time
+
+from position_log import EVENT_CLOSE, EVENT_OPEN, RECORD_SIZE, PositionLog
+
+UP_TOKEN = "1" * 77
+DOWN_TOKEN = "2" * 77
+
+
+def _restart(path):
+    """Simulate a process restart: new log object, replay, return positions"""
+    log = PositionLog(path)
+    return log, log.replay()
+
+
+def test_no_file_created_until_first_append(tmp_path):
+    path = tmp_path / "logs" / "positions.bin"
+    log, positions = _restart(str(path))
+    assert positions == {}
+    assert not path.exists()
+
+    log.append(EVENT_OPEN, UP_TOKEN, 'up', 0.01, 5.0)
+    log.close()
+    assert path.stat().st_size == RECORD_SIZE
+
+
+def test_replay_across_restarts(tmp_path):
+    path = str(tmp_path / "positions.bin")
+    future = time.time() + 900
+
+    log, positions = _restart(path)
+    log.append(EVENT_OPEN, UP_TOKEN, 'up', 0.01, 5.0, future)
+    log.close()
+
+    log, positions = _restart(path)
+    assert positions[UP_TOKEN]['side'] == 'up'
+    assert positions[UP_TOKEN]['shares'] == 5.0
+    assert positions[UP_TOKEN]['entry_price'] == 0.01
+    log.append(EVENT_CLOSE, UP_TOKEN)
+    log.append(EVENT_OPEN, DOWN_TOKEN, 'down', 0.01, 5.0, future)
+    log.close()
+
+    log, positions = _restart(path)
+    assert list(positions) == [DOWN_TOKEN]
+    # Closed pair compacted away
+    assert os.path.getsize(path) == RECORD_SIZE
+    log.close()
+
+
+def test_expired_positions_dropped_and_compacted(tmp_path):
+    path = str(tmp_path / "positions.bin")
+
+    log, _ = _restart(path)
+    log.append(EVENT_OPEN, UP_TOKEN, 'up', 0.01, 5.0, time.time() - 1)
+    log.append(EVENT_OPEN, DOWN_TOKEN, 'down', 0.01, 5.0, 0.0)
+    log.close()
+
+    log, positions = _restart(path)
+    # Expired market is dropped; unknown end time is kept
+    assert list(positions) == [DOWN_TOKEN]
+    assert os.path.getsize(path) == RECORD_SIZE
+    log.close()
+
+    # Repeated restarts do not resurrect or accumulate positions
+    for _ in range(3):
+        log, positions = _restart(path)
+        assert list(positions) == [DOWN_TOKEN]
+        log.close()
+
+
+def test_torn_tail_ignored_and_truncated(tmp_path):
+    path = str(tmp_path / "positions.bin")
+    future = time.time() + 900
+
+    log, _ = _restart(path)
+    log.append(EVENT_OPEN, UP_TOKEN, 'up', 0.01, 5.0, future)
+    log.close()
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * (RECORD_SIZE // 2))  # crash mid-write
+
+    log, positions = _restart(path)
+    assert list(positions) == [UP_TOKEN]
+    assert os.path.getsize(path) == RECORD_SIZE
+
+    # Appends after recovery stay record-aligned
+    log.append(EVENT_OPEN, DOWN_TOKEN, 'down', 0.01, 5.0, future)
+    log.close()
+    log, positions = _restart(path)
+    assert set(positions) == {UP_TOKEN, DOWN_TOKEN}
+    log.close()
@@ -9,27 +9,59 @@ Key optimizations:
 """
 
 import asyncio
+import functools
 import httpx
-import json
 import logging
 import time
-from typing import Dict, Optional, List
-from decimal import Decimal, ROUND_DOWN
+from datetime import datetime
+from typing import Dict, Optional
 from concurrent.futures import ThreadPoolExecutor
 import threading
 
-from py_clob_client.client import ClobClient
-from py_clob_client.clob_types import OrderArgs, OrderType, MarketOrderArgs
-from py_clob_client.order_builder.constants import BUY, SELL
+# Order-building imports live at module scope so no import machinery runs
+# on the order path. Without py-clob-client the module still imports; the
+# client then fails to initialize and trading stays disabled.
+try:
+    from py_clob_client.client import ClobClient
+    from py_clob_client.clob_types import OrderArgs, OrderType
+    from py_clob_client.order_builder.constants import BUY, SELL
+except ImportError:
+    ClobClient = OrderArgs = None
+    BUY, SELL = "BUY", "SELL"
 
-from config import CHAIN_ID, CLOB_API
+    class OrderType:
+        """Mirror of py_clob_client.clob_types.OrderType"""
+        GTC = "GTC"
+        FOK = "FOK"
+
+from config import CLOB_API, POSITION_LOG_FILE
 from auth import get_auth
+from position_log import PositionLog, EVENT_OPEN, EVENT_CLOSE
 
 logger = logging.getLogger(__name__)
 
 # Thread pool for async order submission
 _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="trader")
 
+# Pre-computed order type mapping (unknown types fall back to GTC)
+_ORDER_TYPE = {"FOK": OrderType.FOK, "GTC": OrderType.GTC}
+
+# Trade side by trigger bitmask: bit 0 = UP triggered, bit 1 = DOWN triggered
+_TRADE_SIDES = (None, 'up', 'down', 'up')
+
+
+def _q2(x: float) -> float:
+    """Quantize a price to 2 decimals (round half up) with integer math"""
+    return int(x * 100 + 0.5) / 100.0
+
+
+def _q2_down(x: float) -> float:
+    """
+    Quantize a share size to 2 decimals, rounding down so a sell never
+    exceeds the shares held (1e-9 absorbs float error like 0.29 * 100)
+    """
+    return int(x * 100 + 1e-9) / 100.0
+
 
 class FastTrader:
     """
@@ -47,8 +79,9 @@ class FastTrader:
         self.signer_address: Optional[str] = None
         self.funder_address: Optional[str] = None
         
-        # Position tracking
-        self.active_positions: Dict[str, Dict] = {}  # token_id -> position data
+        # Position tracking (rebuilt from the append-only log on startup)
+        self._position_log = PositionLog(POSITION_LOG_FILE)
+        self.active_positions: Dict[str, Dict] = self._position_log.replay()  # token_id -> position data
         self._position_lock = threading.Lock()
         
         # Pre-computed tick sizes by market
@@ -62,9 +95,11 @@ class FastTrader:
         # Track which market we have pre-signed orders for
         self.presigned_market_id: Optional[str] = None
         
-        # Connection warmup tracking
-        self._last_warmup = 0
-        self._warmup_interval = 60  # seconds
+        # Connection warmup (background timer keeps TLS session alive)
+        self._warmup_interval = 30  # seconds
+        self._warmup_timer: Optional[threading.Timer] = None
+        self._warmup_lock = threading.Lock()
+        self._closed = False
         
         # Initialize client
         self._initialize()
@@ -82,32 +117,49 @@ class FastTrader:
                 if self.funder_address:
                     logger.info(f"Funder mode: {self.funder_address[:10]}...")
                 
-                # Warm up connection
+                # Warm up connection and keep it warm in the background
                 self._warmup_connection()
         except Exception as e:
             logger.warning(f"Could not initialize trader: {e}")
     
     def _warmup_connection(self):
-        """Keep the connection warm with a lightweight request"""
-        if not self.client:
-            return
-        
-        now = time.time()
-        if now - self._last_warmup < self._warmup_interval:
+        """
+        Keep the connection warm with a lightweight request.
+        Re-schedules itself on a daemon timer so the order path never
+        pays for the check.
+        """
+        if not self.client or self._closed:
             return
         
         try:
             # Lightweight call to keep connection alive
             self.client.get_ok()
-            self._last_warmup = now
             logger.debug("Connection warmed up")
         except Exception as e:
             logger.debug(f"Warmup failed: {e}")
+        
+        # Re-arm under the lock so close() cannot miss a freshly started timer
+        with self._warmup_lock:
+            if self._closed:
+                return
+            self._warmup_timer = threading.Timer(self._warmup_interval, self._warmup_connection)
+            self._warmup_timer.daemon = True
+            self._warmup_timer.start()
+    
+    def close(self):
+        """Stop the background warmup and close the position log"""
+        with self._warmup_lock:
+            self._closed = True
+            if self._warmup_timer:
+                self._warmup_timer.cancel()
+                self._warmup_timer = None
+        self._position_log.close()
     
     def _get_tick_size(self, token_id: str) -> str:
         """Get tick size for a token, with caching"""
-        if token_id in self.tick_sizes:
-            return self.tick_sizes[token_id]
+        tick_size = self.tick_sizes.get(token_id)
+        if tick_size is not None:
+            return tick_size
         
         # Default to 0.01 for BTC markets
         tick_size = "0.01"
@@ -123,6 +175,51 @@ class FastTrader:
         self.tick_sizes[token_id] = tick_size
         return tick_size
 
+    @staticmethod
+    def _log_response(label: str, result: Dict):
+        """Log the key fields of an order API response"""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "%s: success=%s, status=%s, orderID=%.16s...",
+                label, result.get('success', 'N/A'), result.get('status', 'N/A'), result.get('orderID') or 'N/A'
+            )
+        error_msg = result.get('errorMsg')
+        if error_msg:
+            logger.warning(f"Order errorMsg: {error_msg}")
+    
+    # =========================================
+    # POSITION EVENTS
+    # =========================================
+    
+    @staticmethod
+    def _market_end_ts(market_info: Dict) -> float:
+        """Unix end time of a market from its Gamma 'endDate' (0 if unknown)"""
+        try:
+            return datetime.fromisoformat(market_info['endDate']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return 0.0
+    
+    def _record_open(self, token_id: str, side: str, shares: float, price: float, market_info: Dict):
+        """Log a fill, then track the position in memory"""
+        self._position_log.append(
+            EVENT_OPEN, token_id, side, price, shares, self._market_end_ts(market_info or {})
+        )
+        with self._position_lock:
+            self.active_positions[token_id] = {
+                'side': side,
+                'shares': shares,
+                'entry_price': price,
+                'entry_time': time.time(),
+                'market': market_info
+            }
+    
+    def _record_close(self, token_id: str):
+        """Log a close, then drop the position from memory"""
+        with self._position_lock:
+            position = self.active_positions.pop(token_id, None)
+        if position is not None:
+            self._position_log.append(EVENT_CLOSE, token_id)
+    
     # =========================================
     # LIVE ORDER MONITORING
     # =========================================
@@ -148,7 +245,7 @@ class FastTrader:
                 size_matched = order.get('size_matched', '0')
                 if size_matched:
                     shares = float(size_matched)
-                    logger.debug(f"Order {order_id[:16]}... filled {shares} shares")
+                    logger.debug("Order %.16s... filled %s shares", order_id, shares)
                     return shares
         except Exception as e:
             logger.debug(f"Error querying filled shares: {e}")
@@ -228,7 +325,7 @@ class FastTrader:
             self.presigned_sells.clear()
             self.presigned_market_id = market_id
         
-        price_rounded = round(price, 2)
+        price_rounded = _q2(price)
         
         # Pre-sign UP buy order
         try:
@@ -277,7 +374,7 @@ class FastTrader:
             order_args = OrderArgs(
                 token_id=token_id,
                 price=0.01,  # Minimum price = instant fill at best bid
-                size=round(shares, 2),
+                size=_q2_down(shares),
                 side=SELL,
                 fee_rate_bps=0
             )
@@ -301,31 +398,27 @@ class FastTrader:
         Returns:
             Order response or None
         """
-        price_rounded = round(price, 2)
+        # START PROFILING: Measure execution latency from trigger detection
+        trigger_start_time = time.perf_counter()
+        
+        price_rounded = _q2(price)
         key = (token_id, price_rounded)
         
-        # Try pre-signed order first (FAST PATH)
-        if key in self.presigned_buys:
+        # Try pre-signed order first (FAST PATH) - take ownership in one lookup
+        signed_order = self.presigned_buys.pop(key, None)
+        if signed_order is not None:
             try:
-                # START PROFILING: Measure execution latency from trigger detection
-                trigger_start_time = time.perf_counter()
-                
-                py_order_type = OrderType.FOK if order_type == "FOK" else OrderType.GTC
-                result = self.client.post_order(self.presigned_buys[key], orderType=py_order_type)
+                py_order_type = _ORDER_TYPE.get(order_type, OrderType.GTC)
+                result = self.client.post_order(signed_order, orderType=py_order_type)
                 
                 # Log API response fields
                 if result:
-                    success = result.get('success', 'N/A')
-                    status = result.get('status', 'N/A')
-                    error_msg = result.get('errorMsg', '')
-                    order_id = result.get('orderID', 'N/A')
-                    logger.info(f"PRE-SIGNED BUY RESPONSE: success={success}, status={status}, orderID={order_id[:16] if order_id != 'N/A' else 'N/A'}...")
-                    if error_msg:
-                        logger.warning(f"Order errorMsg: {error_msg}")
+                    self._log_response("PRE-SIGNED BUY RESPONSE", result)
                     
                     # Get ACTUAL shares filled (may be less than requested due to maker fees)
                     actual_shares = size  # Default to requested size
-                    if order_id and order_id != 'N/A':
+                    order_id = result.get('orderID')
+                    if order_id:
                         filled = self._get_filled_shares(order_id)
                         if filled and filled > 0:
                             actual_shares = filled
@@ -340,17 +433,7 @@ class FastTrader:
                     logger.info(f"BUY ORDER FILLED EXECUTION LATENCY: {execution_latency:.2f}ms")
 
                     # Track position with ACTUAL shares received
-                    with self._position_lock:
-                        self.active_positions[token_id] = {
-                            'side': side,
-                            'shares': actual_shares,  # Use actual shares, not requested
-                            'entry_price': price_rounded,
-                            'entry_time': time.time(),
-                            'market': market_info
-                        }
-                    
-                    # Remove used pre-signed order
-                    del self.presigned_buys[key]
+                    self._record_open(token_id, side, actual_shares, price_rounded, market_info)
                     
                     # IMMEDIATELY pre-sign stop loss with ACTUAL shares
                     self.presign_stop_loss(token_id, actual_shares)
@@ -359,12 +442,38 @@ class FastTrader:
                     
             except Exception as e:
                 logger.debug(f"Pre-signed buy failed, falling back: {e}")
-                # Remove failed pre-signed order
-                del self.presigned_buys[key]
         
         # SLOW PATH: Create and post new order
         return self.place_buy_order(token_id, side, price, size, market_info, order_type)
     
+    async def execute_presigned_buy_async(
+        self,
+        token_id: str,
+        side: str,
+        price: float,
+        size: float,
+        market_info: Dict,
+        order_type: str = "FOK"
+    ) -> Optional[Dict]:
+        """
+        Awaitable execute_presigned_buy for use from the event loop.
+        
+        Posting (and signing, on the slow path) runs on the trader thread
+        pool so the WebSocket listener keeps consuming price updates while
+        the order is in flight.
+        
+        Returns:
+            Order response or None
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _executor,
+            functools.partial(
+                self.execute_presigned_buy,
+                token_id, side, price, size, market_info, order_type
+            )
+        )
+    
     def execute_presigned_stop_loss(self, token_id: str) -> Optional[Dict]:
         """
         Execute a pre-signed stop loss if available.
@@ -375,45 +484,35 @@ class FastTrader:
         # logging.info(token_id)
         # logging.info(self.presigned_sells)
         
-        # Try pre-signed order first (FAST PATH)
-        if token_id in self.presigned_sells:
+        # Try pre-signed order first (FAST PATH) - take ownership in one lookup
+        signed_order = self.presigned_sells.pop(token_id, None)
+        if signed_order is not None:
             try:
                 # FOK = Fill or Kill - execute immediately at best available price or fail
-                result = self.client.post_order(self.presigned_sells[token_id], OrderType.FOK)
+                result = self.client.post_order(signed_order, OrderType.FOK)
                 
                 # Log API response fields
                 if result:
-                    success = result.get('success', 'N/A')
-                    status = result.get('status', 'N/A')
-                    error_msg = result.get('errorMsg', '')
-                    order_id = result.get('orderID', 'N/A')
-                    logger.info(f"PRE-SIGNED STOP LOSS RESPONSE: success={success}, status={status}, orderID={order_id[:16] if order_id != 'N/A' else 'N/A'}...")
-                    if error_msg:
-                        logger.warning(f"Order errorMsg: {error_msg}")
+                    self._log_response("PRE-SIGNED STOP LOSS RESPONSE", result)
                     
                     position = self.active_positions.get(token_id, {})
                     shares = position.get('shares', 0)
                     
                     # If order is LIVE, monitor until resolved
-                    if status == 'LIVE' and order_id and order_id != 'N/A':
+                    order_id = result.get('orderID')
+                    if result.get('status') == 'LIVE' and order_id:
                         logger.warning(f"STOP LOSS IS LIVE (in orderbook) - monitoring until filled...")
                         _executor.submit(self._monitor_live_order, order_id, 'stop_loss', time.time())
                     else:
                         logger.info(f"STOP LOSS EXECUTED (pre-signed): {shares} shares")
                     
                     # Remove from tracked positions
-                    with self._position_lock:
-                        if token_id in self.active_positions:
-                            del self.active_positions[token_id]
-                    
-                    # Remove used pre-signed order
-                    del self.presigned_sells[token_id]
+                    self._record_close(token_id)
                     
                     return result
                     
             except Exception as e:
                 logger.error(f"Pre-signed stop loss failed, falling back: {e}")
-                del self.presigned_sells[token_id]
         
         # SLOW PATH: Sell all tokens (queries actual balance from API)
         return self.sell_all_tokens(token_id)
@@ -445,15 +544,12 @@ class FastTrader:
             logger.warning("Client not initialized")
             return None
         
-        # Warm up connection if needed
-        self._warmup_connection()
-        
         # Round price
-        price_rounded = round(price, 2)
+        price_rounded = _q2(price)
         
         tick_size = self._get_tick_size(token_id)
         
-        logger.debug(f"BUY {side.upper()}: {size} shares @ ${price_rounded} (${size:.2f} total)")
+        logger.debug("BUY %s: %s shares @ $%s ($%.2f total)", side.upper(), size, price_rounded, size)
         
         try:
             # Create order args
@@ -469,22 +565,17 @@ class FastTrader:
             signed_order = self.client.create_order(order_args)
             
             # Post order
-            py_order_type = OrderType.FOK if order_type == "FOK" else OrderType.GTC
+            py_order_type = _ORDER_TYPE.get(order_type, OrderType.GTC)
             result = self.client.post_order(signed_order, orderType=py_order_type)
             
             # Log API response fields
             if result:
-                success = result.get('success', 'N/A')
-                status = result.get('status', 'N/A')
-                error_msg = result.get('errorMsg', '')
-                order_id = result.get('orderID', 'N/A')
-                logger.info(f"BUY ORDER RESPONSE: success={success}, status={status}, orderID={order_id[:16] if order_id != 'N/A' else 'N/A'}...")
-                if error_msg:
-                    logger.warning(f"Order errorMsg: {error_msg}")
+                self._log_response("BUY ORDER RESPONSE", result)
                 
                 # Get ACTUAL shares filled (may be less than requested due to maker fees)
                 actual_shares = size  # Default to requested size
-                if order_id and order_id != 'N/A':
+                order_id = result.get('orderID')
+                if order_id:
                     filled = self._get_filled_shares(order_id)
                     if filled and filled > 0:
                         actual_shares = filled
@@ -494,14 +585,7 @@ class FastTrader:
                 logger.info(f"ORDER FILLED: BUY {side.upper()} {actual_shares} @ ${price_rounded}")
                 
                 # Track position with ACTUAL shares received
-                with self._position_lock:
-                    self.active_positions[token_id] = {
-                        'side': side,
-                        'shares': actual_shares,  # Use actual shares, not requested
-                        'entry_price': price_rounded,
-                        'entry_time': time.time(),
-                        'market': market_info
-                    }
+                self._record_open(token_id, side, actual_shares, price_rounded, market_info)
                 
                 # Pre-sign stop loss with ACTUAL shares
                 self.presign_stop_loss(token_id, actual_shares)
@@ -536,12 +620,12 @@ class FastTrader:
         if not self.client:
             return None
         
-        price_rounded = round(price, 2)
-        size_rounded = round(size, 2)
+        price_rounded = _q2(price)
+        size_rounded = _q2_down(size)
         
         tick_size = self._get_tick_size(token_id)
         
-        logger.debug(f"SELL: {size_rounded} shares @ ${price_rounded}")
+        logger.debug("SELL: %s shares @ $%s", size_rounded, price_rounded)
         
         try:
             order_args = OrderArgs(
@@ -553,25 +637,17 @@ class FastTrader:
             )
             
             signed_order = self.client.create_order(order_args)
-            py_order_type = OrderType.FOK if order_type == "FOK" else OrderType.GTC
+            py_order_type = _ORDER_TYPE.get(order_type, OrderType.GTC)
             result = self.client.post_order(signed_order, orderType=py_order_type)
             
             # Log API response fields
             if result:
-                success = result.get('success', 'N/A')
-                status = result.get('status', 'N/A')
-                error_msg = result.get('errorMsg', '')
-                order_id = result.get('orderID', 'N/A')
-                logger.info(f"SELL ORDER RESPONSE: success={success}, status={status}, orderID={order_id[:16] if order_id != 'N/A' else 'N/A'}...")
-                if error_msg:
-                    logger.warning(f"Order errorMsg: {error_msg}")
+                self._log_response("SELL ORDER RESPONSE", result)
                 
                 logger.info(f"SOLD: {size_rounded} shares @ ${price_rounded}")
                 
                 # Remove from tracked positions
-                with self._position_lock:
-                    if token_id in self.active_positions:
-                        del self.active_positions[token_id]
+                self._record_close(token_id)
                 
                 return result
                 
@@ -614,16 +690,16 @@ class FastTrader:
         if not self.client:
             return None
         
-        size_rounded = round(size, 2)
+        size_rounded = _q2_down(size)
         
-        logger.debug(f"MARKET SELL: {size_rounded} shares")
+        logger.debug("MARKET SELL: %s shares", size_rounded)
         
         try:
             # MarketOrderArgs: amount is in USD for buys, shares for sells
             order_args = OrderArgs(
                 token_id=token_id,
                 price=0.01,  # Minimum price = instant fill at best bid
-                size=round(size, 2),
+                size=_q2_down(size),
                 side=SELL,
                 fee_rate_bps=0
             )
@@ -640,20 +716,12 @@ class FastTrader:
             
             # Log API response fields
             if result:
-                success = result.get('success', 'N/A')
-                status = result.get('status', 'N/A')
-                error_msg = result.get('errorMsg', '')
-                order_id = result.get('orderID', 'N/A')
-                logger.info(f"MARKET SELL RESPONSE: success={success}, status={status}, orderID={order_id[:16] if order_id != 'N/A' else 'N/A'}...")
-                if error_msg:
-                    logger.warning(f"Order errorMsg: {error_msg}")
+                self._log_response("MARKET SELL RESPONSE", result)
                 
                 logger.info(f"MARKET SELL EXECUTED: {size_rounded} shares")
                 
                 # Remove from tracked positions
-                with self._position_lock:
-                    if token_id in self.active_positions:
-                        del self.active_positions[token_id]
+                self._record_close(token_id)
                 
                 return result
             else:
@@ -692,7 +760,7 @@ class FastTrader:
                 for pos in positions:
                     if pos.get('asset') == token_id:
                         size = float(pos.get('size', 0))
-                        logger.debug(f"Token {token_id[:16]}... balance: {size} shares")
+                        logger.debug("Token %.16s... balance: %s shares", token_id, size)
                         return size
                 # Token not found = 0 balance
                 return 0.0
@@ -740,29 +808,22 @@ class FastTrader:
     
     def remove_position(self, token_id: str):
         """Remove a position from tracking"""
-        with self._position_lock:
-            if token_id in self.active_positions:
-                del self.active_positions[token_id]
+        self._record_close(token_id)
     
-    def should_enter_trade(self, price: float, trigger_price: float) -> bool:
+    @staticmethod
+    def should_enter_trade(price: float, trigger_price: float) -> bool:
         """Check if price meets entry criteria"""
         return price >= trigger_price
     
-    def get_trade_side(self, up_price: float, down_price: float, trigger_price: float) -> Optional[str]:
+    @staticmethod
+    def get_trade_side(up_price: float, down_price: float, trigger_price: float) -> Optional[str]:
         """
         Determine which side to trade based on prices
         
         Strategy: Buy when price drops to trigger level (e.g., 0.02)
         Places limit order at entry price (e.g., 0.01)
         
-        Returns 'up', 'down', or None
+        Returns 'up', 'down', or None (UP wins if both trigger)
         """
-        # Buy the side that drops to the trigger price
-        if up_price <= trigger_price:
-            return 'up'
-        elif down_price <= trigger_price:
-            return 'down'
-        return None
-
-
-
+        # Buy the side that drops to the trigger price (branchless lookup)
+        return _TRADE_SIDES[(up_price <= trigger_price) | ((down_price <= trigger_price) << 1)]
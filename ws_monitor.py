@@ -9,17 +9,23 @@ Optimized for minimal CPU usage:
 """
 
 import asyncio
+import functools
 import logging
-from typing import Dict, Optional, Callable, List
-from datetime import datetime
+import random
+from time import monotonic as _monotonic
+from typing import Dict, Optional, Callable, List, Set, Tuple, Union, TYPE_CHECKING
 
 import websockets
-from websockets.exceptions import ConnectionClosed, ConnectionClosedError
+from websockets.exceptions import ConnectionClosed
+
+# datetime is only needed when last_update is read (imported lazily there)
+if TYPE_CHECKING:
+    from datetime import datetime
 
 # Use orjson for faster JSON parsing (falls back to json if not available)
 try:
     import orjson
-    def json_loads(s): return orjson.loads(s)
+    json_loads = orjson.loads  # Accepts both str and bytes frames
     def json_dumps(d): return orjson.dumps(d).decode('utf-8')
 except ImportError:
     import json
@@ -37,6 +43,26 @@ LAST_TRADE_PRICE = 'last_trade_price'
 ASSET_ID_KEY = 'asset_id'
 PRICE_KEY = 'price'
 
+# Quoted JSON string markers for the pre-decode frame filter
+TRADE_MARKER = '"last_trade_price"'
+TRADE_MARKER_BYTES = b'"last_trade_price"'
+
+# Reconnect ladder: fast first retry, truncated exponential growth, bounded attempts
+INITIAL_RECONNECT_DELAY = 0.05
+MAX_RECONNECT_ATTEMPTS = 50
+
+# listen() adds received frames to message_count in batches of this size
+MESSAGE_COUNT_FLUSH = 1024
+
+# Max pending on_price_update deliveries before the oldest is dropped
+PRICE_QUEUE_SIZE = 1024
+
+# Max seconds to wait for first WS prices before seeding via HTTP
+WS_READY_TIMEOUT = 30.0
+
+# Max cached subscribe/unsubscribe frames (one pair per market rotation)
+PAYLOAD_CACHE_SIZE = 16
+
 
 class WebSocketPriceMonitor:
     """
@@ -46,21 +72,46 @@ class WebSocketPriceMonitor:
     
     __slots__ = (
         'ws', 'prices', 'subscribed_tokens', 'connected', 'running',
-        'on_price_update', 'message_count', 'last_update',
-        'reconnect_delay', 'max_reconnect_delay'
+        'on_price_update', 'message_count', 'last_update_ts',
+        'reconnect_delay', 'max_reconnect_delay',
+        '_sub_payload_cache', '_prices_ready', '_awaited_tokens',
+        '_last_update_read', '_updates', '_dispatch_task'
     )
     
     def __init__(self):
         self.ws: Optional[websockets.WebSocketClientProtocol] = None
         self.prices: Dict[str, float] = {}
-        self.subscribed_tokens: List[str] = []
+        self.subscribed_tokens: Set[str] = set()
         self.connected = False
         self.running = False
         self.on_price_update: Optional[Callable[[str, float], None]] = None
         self.message_count = 0
-        self.last_update: Optional[datetime] = None
-        self.reconnect_delay = 1.0
+        self.last_update_ts: Optional[float] = None  # monotonic time of last price change
+        self._last_update_read = False  # Set once anyone reads last_update
+        self.reconnect_delay = INITIAL_RECONNECT_DELAY
         self.max_reconnect_delay = 30.0
+        
+        # (operation, sorted token tuple) -> serialized frame
+        self._sub_payload_cache: Dict[tuple, str] = {}
+        
+        # Signalled once every awaited token has received a price
+        self._prices_ready = asyncio.Event()
+        self._awaited_tokens: Set[str] = set()
+        
+        # Listener -> on_price_update hand-off (bounded, drops oldest when full)
+        self._updates: asyncio.Queue = asyncio.Queue(maxsize=PRICE_QUEUE_SIZE)
+        self._dispatch_task: Optional[asyncio.Task] = None
+    
+    @property
+    def last_update(self) -> Optional['datetime']:
+        """Wall-clock time of the last price update (built on demand)"""
+        from datetime import datetime, timedelta
+        
+        self._last_update_read = True
+        ts = self.last_update_ts
+        if ts is None:
+            return None
+        return datetime.now() - timedelta(seconds=_monotonic() - ts)
     
     async def connect(self):
         """Establish WebSocket connection"""
@@ -69,10 +120,13 @@ class WebSocketPriceMonitor:
                 WS_MARKET_URL,
                 ping_interval=20,
                 ping_timeout=10,
-                close_timeout=5
+                close_timeout=5,
+                compression=None,  # Small JSON frames - deflate is pure CPU overhead
+                max_size=2**20,
+                write_limit=2**20
             )
             self.connected = True
-            self.reconnect_delay = 1.0
+            self.reconnect_delay = INITIAL_RECONNECT_DELAY
             # logger.info(f"WebSocket connected to {WS_MARKET_URL}")
             return True
         except Exception as e:
@@ -80,6 +134,25 @@ class WebSocketPriceMonitor:
             self.connected = False
             return False
     
+    def _get_payload(self, operation: str, token_ids: List[str]) -> str:
+        """
+        Serialized subscription frame, cached per token set.
+        operation='market' is the initial subscription on a fresh connection;
+        'subscribe'/'unsubscribe' modify a live subscription.
+        """
+        key = (operation, tuple(sorted(token_ids)))
+        payload = self._sub_payload_cache.get(key)
+        if payload is None:
+            if operation == 'market':
+                message = {"auth": {}, "type": "market", "assets_ids": list(key[1])}
+            else:
+                message = {"assets_ids": list(key[1]), "operation": operation}
+            
+            if len(self._sub_payload_cache) >= PAYLOAD_CACHE_SIZE:
+                self._sub_payload_cache.clear()
+            payload = self._sub_payload_cache[key] = json_dumps(message)
+        return payload
+    
     async def subscribe(self, token_ids: List[str]):
         """Subscribe to price updates for specific tokens"""
         if not self.ws or not self.connected:
@@ -87,20 +160,42 @@ class WebSocketPriceMonitor:
             return False
 
         try:
-            message = {
-                "auth": {},
-                "type": "market",
-                "assets_ids": token_ids
-            }
-            await self.ws.send(json_dumps(message))
-            self.subscribed_tokens = token_ids
+            await self.ws.send(self._get_payload('market', token_ids))
+            self.subscribed_tokens = set(token_ids)
             # logger.info(f"Subscribed to {len(token_ids)} tokens: {[tid[:10] for tid in token_ids]}")
-            await asyncio.sleep(2)
             return True
         except Exception as e:
             logger.error(f"Subscription failed: {e}")
             return False
     
+    async def resubscribe(self, token_ids: List[str]) -> bool:
+        """
+        Switch the subscription to exactly token_ids on the live connection.
+        Sends an unsubscribe frame for the dropped tokens followed by a
+        subscribe frame for the new ones, back to back without waiting for
+        a reply. Dropped tokens lose their cached prices; any trades still
+        in flight for them are ignored by the subscribed-token filter.
+        """
+        if not self.ws or not self.connected:
+            return False
+        
+        new_tokens = set(token_ids)
+        dropped = self.subscribed_tokens - new_tokens
+        operation = 'subscribe' if self.subscribed_tokens else 'market'
+        
+        try:
+            if dropped:
+                await self.ws.send(self._get_payload('unsubscribe', list(dropped)))
+            await self.ws.send(self._get_payload(operation, token_ids))
+        except Exception as e:
+            logger.error(f"Resubscription failed: {e}")
+            return False
+        
+        for tid in dropped:
+            self.prices.pop(tid, None)
+        self.subscribed_tokens = new_tokens
+        return True
+    
     async def unsubscribe(self, token_ids: List[str]):
         """Unsubscribe from tokens"""
         if not self.ws or not self.connected:
@@ -110,14 +205,12 @@ class WebSocketPriceMonitor:
             # Make a copy to avoid modifying list while iterating
             tokens_to_remove = list(token_ids)
             
-            message = {"assets_ids": tokens_to_remove, "operation": "unsubscribe"}
-            await self.ws.send(json_dumps(message))
+            await self.ws.send(self._get_payload('unsubscribe', tokens_to_remove))
             
             # Clear local state
+            self.subscribed_tokens.difference_update(tokens_to_remove)
             for tid in tokens_to_remove:
                 self.prices.pop(tid, None)
-                self.subscribed_tokens.remove(tid)
-
             
         except Exception as e:
             logger.debug(f"Unsubscribe error: {e}")
@@ -129,102 +222,194 @@ class WebSocketPriceMonitor:
         
         self.running = True
         
-        while self.running and self.connected:
-            try:
-                message = await asyncio.wait_for(self.ws.recv(), timeout=30.0)
-                self._handle_message(message)  # Sync, no await needed
-                
-            except asyncio.TimeoutError:
+        # Callbacks run in their own task so a slow consumer never stalls recv()
+        if self._dispatch_task is None or self._dispatch_task.done():
+            self._dispatch_task = asyncio.create_task(self._dispatch_updates())
+        
+        # Hot-loop locals (re-bound whenever _reconnect swaps the socket)
+        # decode=False: text frames come back as raw bytes, skipping the
+        # UTF-8 decode/validation pass (orjson parses bytes directly)
+        ws = self.ws
+        recv = functools.partial(ws.recv, decode=False)
+        handle = self._handle_message
+        
+        # No per-message wait_for timer: recv() returns buffered frames without
+        # suspending, so bursts drain back-to-back. Dead connections are caught
+        # by the client keepalive (ping_interval/ping_timeout in connect()),
+        # which closes the socket and surfaces here as ConnectionClosed.
+        received = 0  # Flushed into self.message_count in batches
+        try:
+            while self.running and self.connected:
                 try:
-                    pong = await self.ws.ping()
-                    await asyncio.wait_for(pong, timeout=10)
-                except:
-                    logger.warning("Ping timeout, reconnecting...")
-                    await self._reconnect()
-                    
-            except ConnectionClosed:
-                logger.warning("WebSocket connection closed")
-                if self.running:
-                    await self._reconnect()
+                    handle(await recv())  # Sync handler, no await needed
+                    received += 1
+                    if received >= MESSAGE_COUNT_FLUSH:
+                        self.message_count += received
+                        received = 0
+                    continue
                     
-            except Exception as e:
-                logger.error(f"WebSocket error: {e}")
-                if self.running:
-                    await self._reconnect()
+                except ConnectionClosed:
+                    if self.ws is not ws:
+                        return  # Socket replaced by _reconnect_ws; its own listener took over
+                    logger.warning("WebSocket connection closed")
+                        
+                except Exception as e:
+                    logger.error(f"WebSocket error: {e}")
+                
+                if not self.running:
+                    break
+                await self._reconnect()
+                if not self.connected:
+                    break  # Reconnect gave up (or stopped); HTTP fallback takes over
+                ws = self.ws
+                recv = functools.partial(ws.recv, decode=False)
+        finally:
+            self.message_count += received
     
-    def _handle_message(self, raw_message: str):
+    def _handle_message(self, raw_message: Union[bytes, str]):
         """
         Process incoming WebSocket message.
         SYNC function - no async overhead for CPU-bound parsing.
+        Frames arrive as raw bytes from listen() and are never decoded to str.
+        Event handling is inlined (no per-event call) and only
+        last_trade_price events for subscribed tokens are processed.
         """
+        # Early reject: book/price_change/etc. frames carry no trades, skip decoding
+        marker = TRADE_MARKER_BYTES if type(raw_message) is bytes else TRADE_MARKER
+        if marker not in raw_message:
+            return
+        
         try:
             data = json_loads(raw_message)
-            self.message_count += 1
             
             # Fast path: check for list or dict
-            if isinstance(data, list):
-                for item in data:
-                    self._process_event(item)
-            elif isinstance(data, dict):
-                self._process_event(data)
+            if type(data) is dict:
+                events = (data,)
+            elif type(data) is list:
+                events = data
+            else:
+                return
+            
+            subscribed = self.subscribed_tokens
+            prices = self.prices
+            
+            for event in events:
+                if event.get(EVENT_TYPE_KEY) != LAST_TRADE_PRICE:
+                    continue
+                
+                asset_id = event.get(ASSET_ID_KEY)
+                price = event.get(PRICE_KEY)
+                
+                # IMPORTANT: Only process tokens we're subscribed to
+                if not price or asset_id not in subscribed:
+                    continue
+                
+                if type(price) is not float:
+                    try:
+                        price = float(price)
+                    except (ValueError, TypeError):
+                        continue
+                
+                # Update price (unchanged ticks only refresh the timestamp if it is read)
+                if prices.get(asset_id) != price:
+                    prices[asset_id] = price
+                    self.last_update_ts = _monotonic()
+                elif self._last_update_read:
+                    self.last_update_ts = _monotonic()
+                
+                # Wake anyone waiting for the first prices of a subscription
+                awaited = self._awaited_tokens
+                if awaited:
+                    awaited.discard(asset_id)
+                    if not awaited:
+                        self._prices_ready.set()
+                
+                # Queue for the callback if registered (delivered by _dispatch_updates)
+                if self.on_price_update:
+                    updates = self._updates
+                    try:
+                        updates.put_nowait((asset_id, price))
+                    except asyncio.QueueFull:
+                        updates.get_nowait()
+                        updates.put_nowait((asset_id, price))
                 
         except Exception:
             # Silently ignore parse errors (very rare)
             pass
     
-    def _process_event(self, event: dict):
-        """
-        Process a single event from WebSocket.
-        SYNC function - optimized for minimal overhead.
-        Only processes events for subscribed tokens.
-        """
-        # Fast check: only process last_trade_price events
-        if event.get(EVENT_TYPE_KEY) != LAST_TRADE_PRICE:
-            return
-        
-        asset_id = event.get(ASSET_ID_KEY)
-        price_str = event.get(PRICE_KEY)
-        
-        if not asset_id or not price_str:
-            return
-        
-        # IMPORTANT: Only process tokens we're subscribed to
-        if asset_id not in self.subscribed_tokens:
-            return
-        
+    async def _dispatch_updates(self):
+        """Deliver queued price updates to on_price_update"""
+        updates = self._updates
+        while True:
+            asset_id, price = await updates.get()
+            callback = self.on_price_update
+            if callback:
+                try:
+                    callback(asset_id, price)
+                except Exception as e:
+                    logger.error(f"on_price_update failed: {e}")
+    
+    def expect_prices(self, token_ids: List[str]):
+        """Arm the ready event for tokens that have no price yet"""
+        self._awaited_tokens = {tid for tid in token_ids if tid not in self.prices}
+        if self._awaited_tokens:
+            self._prices_ready.clear()
+        else:
+            self._prices_ready.set()
+    
+    async def wait_for_prices(self, timeout: float) -> bool:
+        """Wait until every expected token has a price. Returns False on timeout."""
         try:
-            price = float(price_str)
-        except (ValueError, TypeError):
-            return
-        
-        # Update price
-        self.prices[asset_id] = price
-        self.last_update = datetime.now()
-        
-        # Callback if registered
-        if self.on_price_update:
-            self.on_price_update(asset_id, price)
+            await asyncio.wait_for(self._prices_ready.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
     
     async def _reconnect(self):
-        """Attempt to reconnect with exponential backoff"""
+        """
+        Attempt to reconnect with jittered, truncated exponential backoff.
+        First retry after ~50ms; gives up after MAX_RECONNECT_ATTEMPTS and
+        clears the cached prices, so readers get None and fall back to HTTP
+        until the next market subscription reconnects.
+        """
         self.connected = False
+        attempts = 0
         
         while self.running:
-            logger.info(f"Reconnecting in {self.reconnect_delay}s...")
-            await asyncio.sleep(self.reconnect_delay)
+            attempts += 1
+            if attempts > MAX_RECONNECT_ATTEMPTS:
+                logger.error(f"WebSocket reconnect failed after {MAX_RECONNECT_ATTEMPTS} attempts")
+                # Stale WS prices must not keep driving trades
+                self.prices.clear()
+                return
+            
+            # +/-25% jitter avoids synchronized retries after a server restart
+            delay = min(self.reconnect_delay, self.max_reconnect_delay) * random.uniform(0.75, 1.25)
+            logger.info(f"Reconnecting in {delay:.2f}s (attempt {attempts})...")
+            await asyncio.sleep(delay)
             
             if await self.connect():
                 if self.subscribed_tokens:
-                    await self.subscribe(self.subscribed_tokens)
+                    await self.subscribe(list(self.subscribed_tokens))
                 return
             
-            self.reconnect_delay = min(self.reconnect_delay * 2, self.max_reconnect_delay)
+            self.reconnect_delay = min(self.reconnect_delay * 1.7 + 0.05, self.max_reconnect_delay)
     
     async def close(self):
         """Close WebSocket connection"""
         self.running = False
         self.connected = False
         
+        if self._dispatch_task:
+            self._dispatch_task.cancel()
+            self._dispatch_task = None
+        
+        # Drop undelivered updates so a later listen() does not replay
+        # prices from this connection/market to on_price_update
+        updates = self._updates
+        while not updates.empty():
+            updates.get_nowait()
+        
         if self.ws:
             try:
                 await self.ws.close()
@@ -240,8 +425,13 @@ class WebSocketPriceMonitor:
     
     def get_prices(self, token_ids: List[str]) -> Dict[str, float]:
         """Get prices for multiple tokens (instant, no API call)"""
-        prices = self.prices
-        return {tid: prices[tid] for tid in token_ids if tid in prices}
+        get = self.prices.get
+        result = {}
+        for tid in token_ids:
+            price = get(tid)
+            if price is not None:
+                result[tid] = price
+        return result
 
 
 class HybridPriceMonitor:
@@ -256,6 +446,9 @@ class HybridPriceMonitor:
     )
     
     def __init__(self, http_monitor):
+        # HTTP fallbacks should reuse one pooled connection (no TLS handshake per call)
+        if not http_monitor.use_persistent_client:
+            logger.warning("HTTP fallback uses a fresh client per call (use_persistent_client=False)")
         self.http_monitor = http_monitor
         self.ws_monitor = WebSocketPriceMonitor()
         self.use_websocket = True
@@ -276,7 +469,7 @@ class HybridPriceMonitor:
         
         # Clear all state
         self.ws_monitor.prices.clear()
-        self.ws_monitor.subscribed_tokens = []
+        self.ws_monitor.subscribed_tokens.clear()
         
         # Reconnect
         if await self.ws_monitor.connect():
@@ -289,21 +482,20 @@ class HybridPriceMonitor:
         self.current_up_token = up_token
         self.current_down_token = down_token
 
-        # RECONNECT WebSocket for clean subscription state
-        await self._reconnect_ws()
-
-        # Subscribe to new tokens
-        await self.ws_monitor.subscribe([up_token, down_token])
+        tokens = [up_token, down_token]
         
-        # Quick wait for WebSocket prices (max 15 seconds)
-        for _ in range(60):  # 30 x 0.5s = 15s max
-            up_price = self.ws_monitor.get_price(up_token)
-            down_price = self.ws_monitor.get_price(down_token)
-            if up_price is not None and down_price is not None:
-                # logger.info(f"WS Ready: UP=${up_price:.4f}, DOWN=${down_price:.4f}")
-                # logger.info(f"Cache keys: {list(self.ws_monitor.prices.keys())}")
-                return
-            await asyncio.sleep(0.5)
+        # Arm the ready event first so no update is missed
+        self.ws_monitor.expect_prices(tokens)
+        
+        # Swap tokens on the live connection (unsubscribe old, subscribe new);
+        # RECONNECT for clean subscription state only if that is not possible
+        if not await self.ws_monitor.resubscribe(tokens):
+            await self._reconnect_ws()
+            await self.ws_monitor.subscribe(tokens)
+        
+        # Wait for WebSocket prices - wakes as soon as both tokens have traded
+        if await self.ws_monitor.wait_for_prices(WS_READY_TIMEOUT):
+            return
 
         # No WS prices - seed from HTTP
         logger.info("No WS trade prices yet, fetching via HTTP...")
@@ -316,7 +508,7 @@ class HybridPriceMonitor:
             if up_price is not None and down_price is not None:
                 self.ws_monitor.prices[up_token] = up_price
                 self.ws_monitor.prices[down_token] = down_price
-                self.ws_monitor.last_update = datetime.now()
+                self.ws_monitor.last_update_ts = _monotonic()
                 # logger.info(f"HTTP Seed: UP=${up_price:.4f}, DOWN=${down_price:.4f}")
                 # logger.info(f"Cache keys: {list(self.ws_monitor.prices.keys())}")
             else:
@@ -341,6 +533,17 @@ class HybridPriceMonitor:
 
         return {up_token: up_price, down_token: down_price}
     
+    def get_prices_tuple(self) -> Optional[Tuple[float, float]]:
+        """Get current (up_price, down_price) without building a dict"""
+        prices = self.ws_monitor.prices
+        up_price = prices.get(self.current_up_token)
+        down_price = prices.get(self.current_down_token)
+        
+        if up_price is None or down_price is None:
+            return None
+        
+        return up_price, down_price
+    
     async def get_prices_with_fallback(self) -> Optional[Dict[str, float]]:
         """Get prices with HTTP fallback if WebSocket data unavailable"""
         prices = self.get_prices()